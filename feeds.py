@@ -0,0 +1,297 @@
+import os
+import sys
+import json
+import hashlib
+import urllib.request
+import urllib.error
+from concurrent.futures import ThreadPoolExecutor
+import ipaggr
+from ipaggr import IPRangeAggregation
+
+
+########################################
+# Parsers
+########################################
+def parse_aws(payload):
+    """Extract ranges from AWS ip-ranges.json.
+
+    """
+    data = json.loads(payload)
+    return [pref['ip_prefix'] for pref in data['prefixes']] + \
+           [pref['ipv6_prefix'] for pref in data['ipv6_prefixes']]
+
+
+def parse_google(payload):
+    """Extract ranges from Google goog.json or cloud.json.
+
+    """
+    data = json.loads(payload)
+    ips = []
+    for pref in data['prefixes']:
+        if 'ipv4Prefix' in pref.keys():
+            ips.append(pref['ipv4Prefix'])
+        if 'ipv6Prefix' in pref.keys():
+            ips.append(pref['ipv6Prefix'])
+    return ips
+
+
+def parse_microsoft(payload):
+    """Extract ranges from Microsoft ServiceTags json.
+
+    """
+    data = json.loads(payload)
+    ips = []
+    for pref in data['values']:
+        ips += pref['properties']['addressPrefixes']
+    return ips
+
+
+def parse_csv(payload):
+    """Extract ranges from first column of csv, ex.) DigitalOcean geo feed.
+
+    """
+    return [line.split(',')[0] for line in payload.decode().split('\n')]
+
+
+########################################
+# Functional Class
+########################################
+class Feed():
+    """Provider feed definition.
+
+    Args:
+        name(str): Feed name, used as cache file name.
+        url(str): Feed url. http(s) and file urls are supported.
+        parser(function): Function to extract range strings from payload.
+        headers(dict): Additional request headers, default: None.
+        ignore_invalid(bool): Ignore strange range format, default: False.
+
+    """
+    def __init__(self, name, url, parser, headers=None, ignore_invalid=False):
+        self.name = name
+        self.url = url
+        self.parser = parser
+        self.headers = headers or {}
+        self.ignore_invalid = ignore_invalid
+
+
+FEEDS = [
+    Feed('aws', 'https://ip-ranges.amazonaws.com/ip-ranges.json', parse_aws),
+    Feed('google', 'https://www.gstatic.com/ipranges/goog.json',
+         parse_google),
+    Feed('digital_ocean', 'https://digitalocean.com/geo/google.csv',
+         parse_csv,
+         headers={'User-Agent': 'Mozilla/5.0 (X11; Ubuntu; Linux x86_64; '
+                                'rv:90.0) Gecko/20100101 Firefox/90.0'},
+         ignore_invalid=True),
+]
+
+
+class FeedIngestion():
+    """Fetch feeds concurrently and aggregate changed ones only.
+
+    Raw payloads, validators(ETag and Last-Modified) and aggregated
+    results are cached in cachedir per feed.
+    Conditional requests are sent with cached validators,
+    and payload hash is compared as well for servers and file urls
+    which ignore them.
+
+    Args:
+        feeds(list): List of Feed.
+        cachedir(str): Directory to save cached data, default: ~/.ipfeeds
+        max_workers(int): Concurrent fetch number, default: feed number.
+        timeout(int): Timeout seconds for each fetch, default: 30.
+        verbose(bool): Show progress and details or not.
+
+    Attributes:
+        aggregations(dict): Feed name to IPRangeAggregation,
+            or AggregationSnapshot for feeds loaded from cache.
+        changeds(list): Names of feeds re-aggregated on last update().
+        faileds(list): Names of feeds failed to fetch or aggregate
+            on last update(). Cached result is used for them when exists.
+
+    """
+    def __init__(self, feeds, cachedir='~/.ipfeeds', max_workers=None,
+                 timeout=30, verbose=False):
+        self.feeds = feeds
+        self.cachedir = os.path.expanduser(cachedir)
+        self.max_workers = max_workers or max(len(feeds), 1)
+        self.timeout = timeout
+        self.verbose = verbose
+        self.aggregations = {}
+        self.changeds = []
+        self.faileds = []
+
+        if not os.path.isdir(self.cachedir):
+            if os.path.exists(self.cachedir):
+                raise Exception("Cache dir name is already used.")
+            os.makedirs(self.cachedir)
+
+    def update(self):
+        """Fetch all feeds and refresh aggregations.
+
+        Returns:
+            dict: Feed name to IPRangeAggregation or AggregationSnapshot.
+
+        """
+        self.faileds = []
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            fetcheds = list(executor.map(self._fetch, self.feeds))
+
+        self.changeds = []
+        for (feed, fetched) in zip(self.feeds, fetcheds):
+            if fetched is None and feed.name in self.aggregations:
+                continue
+            if fetched is None:
+                aggregation = self._load_aggregated(feed)
+                if aggregation is not None:
+                    self.aggregations[feed.name] = aggregation
+                    continue
+                # Case: Fetch failed and nothing is cached.
+                if not os.path.isfile(self._cachepath(feed, 'raw')):
+                    continue
+                with open(self._cachepath(feed, 'raw'), 'rb') as fd:
+                    fetched = (fd.read(), self._load_meta(feed))
+
+            if self.verbose:
+                print('{}: aggregate'.format(feed.name))
+            (payload, meta) = fetched
+            try:
+                aggregation = IPRangeAggregation(
+                        feed.parser(payload),
+                        ignore_invalid=feed.ignore_invalid,
+                        verbose=self.verbose)
+            except Exception as exception:
+                # Case: Broken payload, keep previous result if exists.
+                self._fail(feed, exception, action='aggregate')
+                if feed.name not in self.aggregations:
+                    aggregation = self._load_aggregated(feed)
+                    if aggregation is not None:
+                        self.aggregations[feed.name] = aggregation
+                continue
+            self._save(feed, payload, meta, aggregation)
+            self.aggregations[feed.name] = aggregation
+            self.changeds.append(feed.name)
+
+        return self.aggregations
+
+    def _cachepath(self, feed, suffix):
+        return os.path.join(self.cachedir, '{}.{}'.format(feed.name, suffix))
+
+    def _load_meta(self, feed):
+        metapath = self._cachepath(feed, 'json')
+        if not os.path.isfile(metapath):
+            return {}
+        with open(metapath, 'r') as fd:
+            return json.load(fd)
+
+    def _fetch(self, feed):
+        """Fetch one feed conditionally.
+
+        Returns:
+            tuple: (payload, meta) for changed feed,
+                None for not changed or failed.
+
+        """
+        meta = self._load_meta(feed)
+        cached = meta.get('url') == feed.url and \
+            os.path.isfile(self._cachepath(feed, 'raw'))
+
+        headers = dict(feed.headers)
+        if cached and meta.get('etag'):
+            headers['If-None-Match'] = meta['etag']
+        if cached and meta.get('last_modified'):
+            headers['If-Modified-Since'] = meta['last_modified']
+
+        request = urllib.request.Request(feed.url, headers=headers)
+        try:
+            with urllib.request.urlopen(request,
+                                        timeout=self.timeout) as response:
+                payload = response.read()
+                etag = response.headers.get('ETag')
+                last_modified = response.headers.get('Last-Modified')
+        except urllib.error.HTTPError as exception:
+            if exception.code == 304 and cached:
+                if self.verbose:
+                    print('{}: not modified'.format(feed.name))
+                return None
+            return self._fail(feed, exception)
+        except (urllib.error.URLError, OSError) as exception:
+            return self._fail(feed, exception)
+
+        md5 = hashlib.md5(payload).hexdigest()
+        if cached and md5 == meta.get('md5'):
+            if self.verbose:
+                print('{}: not changed'.format(feed.name))
+            return None
+
+        if self.verbose:
+            print('{}: fetched'.format(feed.name))
+        return (payload, {'url': feed.url, 'etag': etag,
+                          'last_modified': last_modified, 'md5': md5})
+
+    def _fail(self, feed, exception, action='fetch'):
+        """Record failed feed, so cached result is used instead.
+
+        """
+        print('{}: {} failed: {}'.format(feed.name, action, exception),
+              file=sys.stderr)
+        self.faileds.append(feed.name)
+        return None
+
+    def _load_aggregated(self, feed):
+        aggrpath = self._cachepath(feed, 'snap')
+        if not os.path.isfile(aggrpath):
+            return None
+        try:
+            return ipaggr.load(aggrpath)
+        except ipaggr.SnapshotFormatError:
+            return None
+
+    def _save(self, feed, payload, meta, aggregation):
+        """Save payload, aggregated result and meta atomically.
+        Meta is written last, so interrupted save is fetched again.
+
+        """
+        aggregation.save(self._cachepath(feed, 'snap'))
+        contents = [
+            ('raw', 'wb', payload),
+            ('json', 'w', json.dumps(meta))]
+        for (suffix, mode, content) in contents:
+            path = self._cachepath(feed, suffix)
+            with open(path + '.tmp', mode) as fd:
+                fd.write(content)
+            os.replace(path + '.tmp', path)
+
+
+if __name__ == '__main__':
+    import argparse
+
+    # Parser
+    parser = argparse.ArgumentParser()
+    parser.add_argument('-c', '--cachedir',
+                        default='~/.ipfeeds',
+                        help='Cache directory. Default: ~/.ipfeeds')
+    parser.add_argument('-o', '--outdir',
+                        default='.',
+                        help='Output directory. Default: .')
+    parser.add_argument('-v', '--verbose',
+                        action='store_true',
+                        help='Show progress and details')
+    args = parser.parse_args()
+
+    # Run
+    ingestion = FeedIngestion(FEEDS, cachedir=args.cachedir,
+                              verbose=args.verbose)
+    aggregations = ingestion.update()
+    for (name, aggr) in aggregations.items():
+        if name not in ingestion.changeds:
+            continue
+        print('{}: IPv4 aggregated: {}, IPv6 aggregated: {}'.format(
+            name, len(aggr.aggregateds_ipv4), len(aggr.aggregateds_ipv6)))
+        for (family, exported) in [('ipv4', aggr.export_aggregated_ipv4()),
+                                   ('ipv6', aggr.export_aggregated_ipv6())]:
+            filename = os.path.join(
+                    args.outdir, '{}_{}.txt'.format(name, family))
+            with open(filename, 'w') as fd:
+                fd.write('\n'.join(exported))
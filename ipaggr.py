@@ -1,8 +1,38 @@
+import os
+import sys
+import mmap
+import array
+import bisect
+import struct
 import ipaddress
-from tools import str2network
+from concurrent.futures import ProcessPoolExecutor
+from tools import str2networks
+from tools import iprange2cidrs
 from tools import Countdown
 
 
+# Top level prefix length to split ranges into shards in parallel mode.
+SHARD_PREFIXLEN_IPV4 = 8
+SHARD_PREFIXLEN_IPV6 = 16
+
+# Snapshot layout, little endian:
+#   header: magic, version, reserved,
+#           numbers of aggregated ipv4, ipv6, missing ipv4, ipv6.
+#   sections in same order: addresses, then prefix lengths,
+#           each padded to 8 bytes.
+#           IPv4 address is uint32, IPv6 address is uint64 pair(high, low).
+SNAPSHOT_MAGIC = b'IPAGGR\x00\x00'
+SNAPSHOT_VERSION = 1
+SNAPSHOT_HEADER = struct.Struct('<8sII4Q')
+
+
+class SnapshotFormatError(Exception):
+    """File is not in aggregation snapshot format.
+
+    """
+    pass
+
+
 class AggregatedRange():
     """Aggregated IP range.
 
@@ -125,6 +155,8 @@ class IPRangeAggregation():
     Args:
         ipranges_str (list): List of IP ranges to aggregate.
             IP range must be string like "XXX.XXX.XXX.XXX/24".
+            Range format "XXX.XXX.XXX.XXX-YYY.YYY.YYY.YYY"
+            and "XXX.XXX.XXX.XXX <count>" are also accepted.
 
         maxranges_ipv4 (int): Maximum range number for ipv4.
             If aggregated range is larger than maxranges, aggregate roughly.
@@ -137,6 +169,10 @@ class IPRangeAggregation():
 
         verbose(bool): Show progress and details or not.
 
+        processes(int): Process number for parallel mode, default: None.
+            Ranges are split into shards by top level prefix
+            and aggregated in process pool. None or 1 for serial mode.
+
     Attributes:
         iprangelist_ipv4 (list): List of ipaddress format data for ipv4.
 
@@ -150,8 +186,9 @@ class IPRangeAggregation():
 
     def __init__(self, iprangelist_str,
                  maxranges_ipv4=None, maxranges_ipv6=None,
-                 ignore_invalid=False, verbose=False):
+                 ignore_invalid=False, verbose=False, processes=None):
         self.verbose = verbose
+        self.processes = processes
         self.maxranges_ipv4 = maxranges_ipv4
         self.maxranges_ipv6 = maxranges_ipv6
         self.ignore_invalid = ignore_invalid
@@ -160,8 +197,10 @@ class IPRangeAggregation():
         self.iprangelist_ipv4 = list_ipv4
         self.iprangelist_ipv6 = list_ipv6
 
-        aggr_ipv4 = self._aggregate_iprange(list_ipv4, self.maxranges_ipv4)
-        aggr_ipv6 = self._aggregate_iprange(list_ipv6, self.maxranges_ipv6)
+        aggr_ipv4 = self._aggregate_iprange(
+                list_ipv4, self.maxranges_ipv4, SHARD_PREFIXLEN_IPV4)
+        aggr_ipv6 = self._aggregate_iprange(
+                list_ipv6, self.maxranges_ipv6, SHARD_PREFIXLEN_IPV6)
 
         self.aggregateds_ipv4 = aggr_ipv4
         self.aggregateds_ipv6 = aggr_ipv6
@@ -172,27 +211,155 @@ class IPRangeAggregation():
 
         for iprange_str in iprangelist_str:
             try:
-                network = str2network(iprange_str)
+                networks = str2networks(iprange_str)
             except Exception as exception:
                 if not ignore_invalid:
                     raise exception
+                continue
 
-            if isinstance(network, ipaddress.IPv4Network):
-                list_ipv4.append(AggregatedRange(network))
-            elif isinstance(network, ipaddress.IPv6Network):
-                list_ipv6.append(AggregatedRange(network))
+            for network in networks:
+                if isinstance(network, ipaddress.IPv4Network):
+                    list_ipv4.append(AggregatedRange(network))
+                elif isinstance(network, ipaddress.IPv6Network):
+                    list_ipv6.append(AggregatedRange(network))
 
         return (list_ipv4, list_ipv6)
 
-    def _aggregate_iprange(self, list_ip, maxranges):
+    def _aggregate_iprange(self, list_ip, maxranges, shard_prefixlen):
         if not list_ip:
             return []
 
-        uniq_list = self._uniq_iprange(list_ip)
-        aggr_list = self._do_aggregate(uniq_list)
-        if maxranges and maxranges >= 1:
-            aggr_list = self._do_rough_aggregate(aggr_list, maxranges)
+        if self.processes and self.processes > 1:
+            with ProcessPoolExecutor(max_workers=self.processes) as executor:
+                aggr_list = self._aggregate_parallel(
+                        executor, list_ip, shard_prefixlen)
+                if maxranges and maxranges >= 1:
+                    aggr_list = self._rough_aggregate_parallel(
+                            executor, aggr_list, maxranges, shard_prefixlen)
+        else:
+            uniq_list = self._uniq_iprange(list_ip)
+            aggr_list = self._do_aggregate(uniq_list)
+            if maxranges and maxranges >= 1:
+                aggr_list = self._do_rough_aggregate(aggr_list, maxranges)
+
+        # Same order for serial and parallel mode, longer prefix first.
+        # Aggregation without maxranges already results in this order.
+        # Missings depend on aggregation order, so sort them by address.
+        aggr_list.sort(key=lambda arange: (-arange.prefixlen, arange))
+        for arange in aggr_list:
+            arange.missings.sort()
+        return aggr_list
+
+    def _aggregate_parallel(self, executor, list_ip, shard_prefixlen):
+        """Aggregate ranges shard by shard in process pool.
+        No aggregation crosses shard boundary below shard_prefixlen,
+        so only shorter ranges and whole shards are stitched serially.
+
+        Args:
+            executor(ProcessPoolExecutor): Process pool.
+            list_ip(list): Candidates to be aggregated.
+            shard_prefixlen(int): Prefix length of shard.
+
+        Returns:
+            list: List of aggregated ranges.
+
+        """
+        (stitch_list, shards) = _split_shards(list_ip, shard_prefixlen)
+
+        # Case: Shard is covered by shorter range, dedup serially.
+        if stitch_list:
+            stitch_list = self._uniq_iprange(stitch_list)
+            shift = stitch_list[0].network.max_prefixlen - shard_prefixlen
+            starts = [int(arange.network.network_address) >> shift
+                      for arange in stitch_list]
+            for key in list(shards.keys()):
+                index = bisect.bisect_right(starts, key) - 1
+                if index >= 0 and key <= int(
+                        stitch_list[index].network.broadcast_address) >> shift:
+                    stitch_list += shards.pop(key)
+
+        aggr_list = []
+        for shard_list in executor.map(_aggregate_shard,
+                                       [shards[key] for key in sorted(shards)]):
+            for arange in shard_list:
+                if arange.prefixlen <= shard_prefixlen:
+                    stitch_list.append(arange)
+                else:
+                    aggr_list.append(arange)
+
+        if stitch_list:
+            aggr_list += self._do_aggregate(self._uniq_iprange(stitch_list))
+        return aggr_list
+
+    def _rough_aggregate_parallel(self, executor, aggr_list_in, maxranges,
+                                  shard_prefixlen):
+        """Aggregate ranges roughly shard by shard in process pool.
+
+        Rough aggregation reduces longest prefix level one by one,
+        and result of each level does not depend on reducing order.
+        Each shard reports its range number per level first,
+        then all shards are reduced to the level where total number
+        fits to maxranges. Levels over shard boundary continue serially.
+
+        Args:
+            executor(ProcessPoolExecutor): Process pool.
+            aggr_list_in(list): Candidates to be aggregated.
+            maxranges(int): Max aggregated range number.
+            shard_prefixlen(int): Prefix length of shard.
+
+        Returns:
+            list: List of aggregated ranges.
+
+        """
+        if len(aggr_list_in) <= maxranges:
+            return aggr_list_in
+
+        (rest_list, shards) = _split_shards(aggr_list_in, shard_prefixlen)
+        shard_lists = [shards[key] for key in sorted(shards)]
+        stitcher = IPRangeAggregation([])
+
+        def _count_stitched(networks):
+            if not networks:
+                return len(rest_list)
+            stitched = [AggregatedRange(arange.network)
+                        for arange in rest_list] + \
+                       [AggregatedRange(network) for network in networks]
+            return len(stitcher._do_aggregate(stitched))
+
+        profiles = list(executor.map(
+                _rough_profile_shard, shard_lists,
+                [shard_prefixlen] * len(shard_lists)))
+
+        maxlen = max([arange.prefixlen for arange in aggr_list_in])
+        level = shard_prefixlen + 1
+        for prefixlen in range(maxlen, shard_prefixlen, -1):
+            total = 0
+            fulls = []
+            for (shard_list, profile) in zip(shard_lists, profiles):
+                (count, full) = next((count, full) for (maxpl, count, full)
+                                     in profile if maxpl <= prefixlen)
+                total += count
+                if full:
+                    fulls.append(shard_list[0].network.supernet(
+                        new_prefix=shard_prefixlen))
+            if total + _count_stitched(fulls) <= maxranges:
+                level = prefixlen
+                break
 
+        aggr_list = []
+        stitch_list = rest_list
+        for shard_list in executor.map(
+                _rough_aggregate_shard, shard_lists,
+                [level] * len(shard_lists)):
+            for arange in shard_list:
+                if arange.prefixlen <= shard_prefixlen:
+                    stitch_list.append(arange)
+                else:
+                    aggr_list.append(arange)
+
+        aggr_list += stitcher._do_aggregate(stitch_list)
+        if len(aggr_list) > maxranges:
+            aggr_list = self._do_rough_aggregate(aggr_list, maxranges)
         return aggr_list
 
     def _uniq_iprange(self, list_ip):
@@ -272,6 +439,31 @@ class IPRangeAggregation():
         Returns:
             list: List of aggregated ranges.
 
+        """
+        aggr_list = aggr_list_in.copy()
+
+        if self.verbose:
+            countdown = Countdown(prefix='RoughAggregation: ', suffix=' left.')
+        else:
+            countdown = Countdown(reportmode=None)
+
+        while len(aggr_list) > maxranges:
+            countdown.print(len(aggr_list) - maxranges)
+            aggr_list = self._rough_aggregate_level(aggr_list)
+
+        countdown.close('Done')
+
+        return aggr_list
+
+    def _rough_aggregate_level(self, aggr_list_in):
+        """Pseudo aggregate all ranges with longest prefix length.
+
+        Args:
+            aggr_list_in(list): Candidates to be aggregated.
+
+        Returns:
+            list: List of aggregated ranges.
+
         """
         def _recursive_aggregate(base, supers):
             """Aggregate roughly aggregated range with other ranges.
@@ -290,26 +482,14 @@ class IPRangeAggregation():
             supers.append(base)
             return supers
 
-        aggr_list = aggr_list_in.copy()
-
-        if self.verbose:
-            countdown = Countdown(prefix='RoughAggregation: ', suffix=' left.')
-        else:
-            countdown = Countdown(reportmode=None)
-
-        while len(aggr_list) > maxranges:
-            countdown.print(len(aggr_list) - maxranges)
-
-            prefixlen = max([arange.prefixlen for arange in aggr_list])
+        prefixlen = max([arange.prefixlen for arange in aggr_list_in])
 
-            bases = [base for base in aggr_list if base.prefixlen == prefixlen]
-            aggr_list = [snet for snet in aggr_list
-                         if snet.prefixlen < prefixlen]
-            for base in bases:
-                aggregated = base.pseudo_aggregate()
-                _recursive_aggregate(aggregated, aggr_list)
-
-        countdown.close('Done')
+        bases = [base for base in aggr_list_in if base.prefixlen == prefixlen]
+        aggr_list = [snet for snet in aggr_list_in
+                     if snet.prefixlen < prefixlen]
+        for base in bases:
+            aggregated = base.pseudo_aggregate()
+            _recursive_aggregate(aggregated, aggr_list)
 
         return aggr_list
 
@@ -333,6 +513,28 @@ class IPRangeAggregation():
         """
         return self.export_aggregated_ipv4() + self.export_aggregated_ipv6()
 
+    def iter_aggregated_ipv4(self):
+        """Iterate aggregated result as integers.
+        IPv4 only.
+
+        Yields:
+            tuple: (network address as int, prefix length).
+
+        """
+        for arange in self.aggregateds_ipv4:
+            yield (int(arange.network.network_address), arange.prefixlen)
+
+    def iter_aggregated_ipv6(self):
+        """Iterate aggregated result as integers.
+        IPv6 only.
+
+        Yields:
+            tuple: (network address as int, prefix length).
+
+        """
+        for arange in self.aggregateds_ipv6:
+            yield (int(arange.network.network_address), arange.prefixlen)
+
     def export_missings_ipv4(self):
         """Export not existing iprange when aggregated.
         Export ipv4 only.
@@ -356,17 +558,407 @@ class IPRangeAggregation():
         return self.export_missings_ipv4()\
                + self.export_missings_ipv6()
 
+    def save(self, path):
+        """Save aggregated result as binary snapshot.
+        Reload it with load(path).
+
+        Args:
+            path(str): Snapshot file path.
+
+        """
+        def _pairs(networks):
+            return [(int(network.network_address), network.prefixlen)
+                    for network in networks]
+
+        _save_snapshot(path, [
+            list(self.iter_aggregated_ipv4()),
+            list(self.iter_aggregated_ipv6()),
+            _pairs(missing for arange in self.aggregateds_ipv4
+                   for missing in arange.missings),
+            _pairs(missing for arange in self.aggregateds_ipv6
+                   for missing in arange.missings)])
+
+
+class AggregationSnapshot():
+    """Aggregated result loaded from snapshot file.
+    Data is memory mapped read only, so pages are shared
+    between processes loading same file.
+
+    Args:
+        path(str): Snapshot file path.
+
+    Attributes:
+        counts(tuple): Numbers of aggregated ipv4, ipv6,
+            missing ipv4 and ipv6.
+
+    """
+    def __init__(self, path):
+        with open(path, 'rb') as fd:
+            if os.fstat(fd.fileno()).st_size < SNAPSHOT_HEADER.size:
+                raise SnapshotFormatError(path)
+            self._mmap = mmap.mmap(fd.fileno(), 0, access=mmap.ACCESS_READ)
+
+        self.path = path
+        (magic, version, _, *counts) = SNAPSHOT_HEADER.unpack_from(self._mmap)
+        if magic != SNAPSHOT_MAGIC or version != SNAPSHOT_VERSION:
+            raise SnapshotFormatError(path)
+        self.counts = tuple(counts)
+
+        self._view = memoryview(self._mmap)
+        offset = SNAPSHOT_HEADER.size
+        self._sections = []
+        for (num, family) in zip(self.counts, [4, 6, 4, 6]):
+            (typecode, width) = ('I', 1) if family == 4 else ('Q', 2)
+            size = num * width * struct.calcsize(typecode)
+            if offset + size + num > len(self._mmap):
+                raise SnapshotFormatError(path)
+            addresses = _cast(self._view[offset:offset + size], typecode)
+            offset = _align(offset + size)
+            prefixlens = self._view[offset:offset + num]
+            offset = _align(offset + num)
+            self._sections.append((family, addresses, prefixlens))
+
+    def close(self):
+        """Release memory map.
+        Views are released first, so iterators still alive
+        do not block closing. They raise ValueError when resumed.
+
+        """
+        for (_, addresses, prefixlens) in self._sections:
+            if isinstance(addresses, memoryview):
+                addresses.release()
+            prefixlens.release()
+        self._sections = []
+        self._view.release()
+        self._mmap.close()
+
+    def _iter_section(self, index):
+        """Iterate one section, validating each range lazily.
+        Loading stays constant time, and broken range raises
+        SnapshotFormatError when reached.
+
+        """
+        if not self._sections:
+            raise ValueError('Snapshot is closed: {}'.format(self.path))
+        (family, addresses, prefixlens) = self._sections[index]
+        if family == 4:
+            pairs = zip(addresses, prefixlens)
+            bits = 32
+        else:
+            pairs = (((addresses[2 * position] << 64)
+                      | addresses[2 * position + 1], prefixlen)
+                     for (position, prefixlen) in enumerate(prefixlens))
+            bits = 128
+
+        for (start, prefixlen) in pairs:
+            if prefixlen > bits or start & ((1 << (bits - prefixlen)) - 1):
+                raise SnapshotFormatError('{}: {}/{}'.format(
+                    self.path, start, prefixlen))
+            yield (start, prefixlen)
+
+    def _export_section(self, index):
+        (family, _, _) = self._sections[index]
+        if family == 4:
+            network_class = ipaddress.IPv4Network
+        else:
+            network_class = ipaddress.IPv6Network
+        return [str(network_class(pair))
+                for pair in self._iter_section(index)]
+
+    def iter_aggregated_ipv4(self):
+        """Iterate aggregated result as integers.
+        IPv4 only.
+
+        Yields:
+            tuple: (network address as int, prefix length).
+
+        """
+        return self._iter_section(0)
+
+    def iter_aggregated_ipv6(self):
+        """Iterate aggregated result as integers.
+        IPv6 only.
+
+        Yields:
+            tuple: (network address as int, prefix length).
+
+        """
+        return self._iter_section(1)
+
+    def export_aggregated_ipv4(self):
+        """Export aggregated result.
+        IPv4 only.
+
+        """
+        return self._export_section(0)
+
+    def export_aggregated_ipv6(self):
+        """Export aggregated result.
+        IPv6 only.
+
+        """
+        return self._export_section(1)
+
+    def export_aggregated(self):
+        """Export aggregated result.
+
+        """
+        return self.export_aggregated_ipv4() + self.export_aggregated_ipv6()
+
+    def export_missings_ipv4(self):
+        """Export not existing iprange when aggregated.
+        Export ipv4 only.
+
+        """
+        return self._export_section(2)
+
+    def export_missings_ipv6(self):
+        """Export not existing iprange when aggregated.
+        Export ipv6 only.
+
+        """
+        return self._export_section(3)
+
+    def export_missings(self):
+        """Export not existing iprange when aggregated.
+
+        """
+        return self.export_missings_ipv4()\
+               + self.export_missings_ipv6()
+
+    def save(self, path):
+        """Save snapshot to other path.
+
+        Args:
+            path(str): Snapshot file path.
+
+        """
+        _save_snapshot(path, [list(self._iter_section(index))
+                              for index in range(4)])
+
+
+########################################
+# Snapshot
+########################################
+def _align(offset):
+    return (offset + 7) & ~7
+
+
+def _cast(view, typecode):
+    """Cast little endian bytes to integer sequence.
+    Zero copy on little endian hosts.
+
+    """
+    if sys.byteorder == 'little':
+        return view.cast(typecode)
+    values = array.array(typecode, view.tobytes())
+    values.byteswap()
+    return values
+
+
+def _save_snapshot(path, sections):
+    """Write snapshot file atomically.
+
+    Args:
+        path(str): Snapshot file path.
+        sections(list): Lists of (network address as int, prefix length)
+            for aggregated ipv4, ipv6, missing ipv4 and ipv6.
+
+    """
+    with open(path + '.tmp', 'wb') as fd:
+        fd.write(SNAPSHOT_HEADER.pack(
+            SNAPSHOT_MAGIC, SNAPSHOT_VERSION, 0,
+            *[len(section) for section in sections]))
+        for (section, family) in zip(sections, [4, 6, 4, 6]):
+            if family == 4:
+                addresses = array.array(
+                        'I', [start for (start, _) in section])
+            else:
+                addresses = array.array('Q', [
+                    half for (start, _) in section
+                    for half in (start >> 64, start & 0xffffffffffffffff)])
+            if sys.byteorder != 'little':
+                addresses.byteswap()
+            prefixlens = bytes([prefixlen for (_, prefixlen) in section])
+            for data in [addresses.tobytes(), prefixlens]:
+                fd.write(data)
+                fd.write(b'\x00' * (_align(len(data)) - len(data)))
+    os.replace(path + '.tmp', path)
+
+
+def load(path):
+    """Load aggregated result saved by save(path).
+    No pickle is used, file content is only read as integers.
+
+    Args:
+        path(str): Snapshot file path.
+
+    Returns:
+        AggregationSnapshot: Loaded result.
+
+    """
+    return AggregationSnapshot(path)
+
+
+def is_snapshot(path):
+    """Check file starts with snapshot magic or not.
+
+    """
+    with open(path, 'rb') as fd:
+        return fd.read(len(SNAPSHOT_MAGIC)) == SNAPSHOT_MAGIC
+
+
+########################################
+# Parallel mode workers
+########################################
+def _split_shards(list_ip, shard_prefixlen):
+    """Split ranges by top level prefix.
+
+    Returns:
+        tuple: (list of ranges shorter than or equal to shard_prefixlen,
+                dict of shard key to list of ranges)
+
+    """
+    rest_list = []
+    shards = {}
+    shift = list_ip[0].network.max_prefixlen - shard_prefixlen
+    for arange in list_ip:
+        if arange.prefixlen <= shard_prefixlen:
+            rest_list.append(arange)
+        else:
+            key = int(arange.network.network_address) >> shift
+            shards.setdefault(key, []).append(arange)
+    return (rest_list, shards)
+
+
+def _aggregate_shard(shard_list):
+    aggregation = IPRangeAggregation([])
+    return aggregation._do_aggregate(aggregation._uniq_iprange(shard_list))
+
+
+def _rough_profile_shard(shard_list, shard_prefixlen):
+    """Count ranges of shard per rough aggregation level.
+
+    Returns:
+        list: (longest prefix length, range number, whole shard or not)
+            from longer level.
+            Whole shard is not counted because it may be aggregated
+            with other shards.
+
+    """
+    aggregation = IPRangeAggregation([])
+    maxpl = max([arange.prefixlen for arange in shard_list])
+    profile = [(maxpl, len(shard_list), False)]
+    while maxpl > shard_prefixlen + 1:
+        shard_list = aggregation._rough_aggregate_level(shard_list)
+        maxpl = max([arange.prefixlen for arange in shard_list])
+        if maxpl <= shard_prefixlen:
+            profile.append((maxpl, 0, True))
+            break
+        profile.append((maxpl, len(shard_list), False))
+    return profile
+
+
+def _rough_aggregate_shard(shard_list, level):
+    aggregation = IPRangeAggregation([])
+    while max([arange.prefixlen for arange in shard_list]) > level:
+        shard_list = aggregation._rough_aggregate_level(shard_list)
+    return shard_list
+
+
+def _to_boundaries(pairs, bits):
+    """Convert ranges to sorted boundaries of merged intervals.
+
+    Args:
+        pairs(iterable): (network address as int, prefix length).
+        bits(int): Address length.
+
+    Returns:
+        list: [start0, end0 + 1, start1, end1 + 1, ...]
+
+    """
+    boundaries = []
+    for (start, prefixlen) in sorted(pairs):
+        stop = start + (1 << (bits - prefixlen))
+        if boundaries and start <= boundaries[-1]:
+            boundaries[-1] = max(boundaries[-1], stop)
+        else:
+            boundaries += [start, stop]
+    return boundaries
+
+
+def _diff_boundaries(old, new, bits, network_class):
+    """Compare two boundary lists in one linear merge.
+
+    Returns:
+        tuple: (added networks, removed networks)
+
+    """
+    addeds = []
+    removeds = []
+    (i, j) = (0, 0)
+    (in_old, in_new) = (False, False)
+    opened = None
+    while i < len(old) or j < len(new):
+        position = min(old[i] if i < len(old) else 1 << bits,
+                       new[j] if j < len(new) else 1 << bits)
+        if i < len(old) and old[i] == position:
+            in_old = not in_old
+            i += 1
+        if j < len(new) and new[j] == position:
+            in_new = not in_new
+            j += 1
+
+        if opened is not None:
+            (start, target) = opened
+            target += [network_class(pair) for pair
+                       in iprange2cidrs(start, position - 1, bits)]
+            opened = None
+        if in_new and not in_old:
+            opened = (position, addeds)
+        elif in_old and not in_new:
+            opened = (position, removeds)
+
+    return (addeds, removeds)
+
+
+def diff(old, new):
+    """Compare two aggregation results.
+
+    Args:
+        old(IPRangeAggregation): Former result.
+        new(IPRangeAggregation): Latter result.
+
+    Returns:
+        tuple: (added, removed).
+            Lists of minimal CIDR strings, IPv4 first and sorted.
+
+    """
+    (addeds_ipv4, removeds_ipv4) = _diff_boundaries(
+            _to_boundaries(old.iter_aggregated_ipv4(), 32),
+            _to_boundaries(new.iter_aggregated_ipv4(), 32),
+            32, ipaddress.IPv4Network)
+    (addeds_ipv6, removeds_ipv6) = _diff_boundaries(
+            _to_boundaries(old.iter_aggregated_ipv6(), 128),
+            _to_boundaries(new.iter_aggregated_ipv6(), 128),
+            128, ipaddress.IPv6Network)
+
+    return ([str(network) for network in addeds_ipv4 + addeds_ipv6],
+            [str(network) for network in removeds_ipv4 + removeds_ipv6])
+
 
 if __name__ == '__main__':
-    import sys
     import argparse
+    import ipexport
 
     # Parser
     parser = argparse.ArgumentParser()
     parser.add_argument('file',
                         nargs='?',
                         default=None,
-                        help='Txt format ip range list.')
+                        help='Txt format ip range list. ' +
+                             'CIDR, address, "start-end" and ' +
+                             '"start count" formats are accepted.')
     parser.add_argument('-m', '--maxranges',
                         type=int,
                         default=0,
@@ -376,9 +968,53 @@ if __name__ == '__main__':
     parser.add_argument('-v', '--verbose',
                         action='store_true',
                         help='Show progress and details')
+    parser.add_argument('-p', '--processes',
+                        type=int,
+                        default=None,
+                        help='Process number for parallel aggregation. ' +
+                             'Default: serial')
+    parser.add_argument('-d', '--diff',
+                        nargs=2,
+                        metavar=('OLD', 'NEW'),
+                        default=None,
+                        help='Show added(+) and removed(-) ranges ' +
+                             'between two txt format ip range lists ' +
+                             'or snapshots.')
+    parser.add_argument('-f', '--format',
+                        choices=['text', 'ipset', 'nft', 'binary'],
+                        default='text',
+                        help='Output format. Default: text')
+    parser.add_argument('-s', '--setname',
+                        default='ipaggr',
+                        help='Set name for ipset and nft format. ' +
+                             'IPv6 set is suffixed with "6". ' +
+                             'Default: ipaggr')
+    parser.add_argument('-o', '--output',
+                        default=None,
+                        help='Output file. Default: stdout')
+    parser.add_argument('--save',
+                        default=None,
+                        help='Save aggregated result as binary snapshot ' +
+                             'instead of output.')
     args = parser.parse_args()
 
     # Run
+    if args.diff:
+        aggrs = []
+        for filename in args.diff:
+            if is_snapshot(filename):
+                aggrs.append(load(filename))
+                continue
+            with open(filename, 'r') as fd:
+                aggrs.append(IPRangeAggregation(fd.readlines(),
+                                                verbose=args.verbose))
+        (addeds, removeds) = diff(aggrs[0], aggrs[1])
+        for added in addeds:
+            print('+{}'.format(added))
+        for removed in removeds:
+            print('-{}'.format(removed))
+        sys.exit(0)
+
     if args.file:
         with open(args.file, 'r') as fd:
             lines = fd.readlines()
@@ -393,12 +1029,34 @@ if __name__ == '__main__':
     aggr = IPRangeAggregation(lines,
                               maxranges_ipv4=args.maxranges,
                               maxranges_ipv6=args.maxranges,
-                              verbose=args.verbose)
-    if args.verbose:
+                              verbose=args.verbose,
+                              processes=args.processes)
+    if args.save:
+        aggr.save(args.save)
+        sys.exit(0)
+
+    if args.verbose and args.format == 'text':
         print('Aggregateds')
         print('\n'.join(aggr.export_aggregated()))
         if args.maxranges > 0:
             print('Missings')
             print('\n'.join(aggr.export_missings()))
+        sys.exit(0)
+
+    mode = 'wb' if args.format == 'binary' else 'w'
+    if args.output:
+        fd = open(args.output, mode)
+    elif args.format == 'binary':
+        fd = sys.stdout.buffer
     else:
-        print('\n'.join(aggr.export_aggregated()))
+        fd = sys.stdout
+
+    if args.format == 'text':
+        ipexport.write_text(fd, aggr)
+    elif args.format == 'ipset':
+        ipexport.write_ipset(fd, aggr, args.setname, args.setname + '6')
+    elif args.format == 'nft':
+        ipexport.write_nft(fd, aggr, args.setname, args.setname + '6')
+    elif args.format == 'binary':
+        ipexport.write_binary(fd, aggr)
+    fd.flush()
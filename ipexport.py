@@ -0,0 +1,155 @@
+import socket
+import struct
+import ipaddress
+
+
+# Binary record: tag(4 or 6), network address, prefix length.
+RECORD_IPV4 = struct.Struct('>B4sB')
+RECORD_IPV6 = struct.Struct('>B16sB')
+
+# Elements per nft statement, to keep each command line bounded.
+NFT_CHUNK = 4096
+
+
+########################################
+# Functions
+########################################
+def _str_ipv4(start):
+    return socket.inet_ntoa(start.to_bytes(4, 'big'))
+
+
+def _str_ipv6(start):
+    # inet_ntop spells IPv4 mapped addresses differently from ipaddress,
+    # so format same as export_aggregated.
+    return str(ipaddress.IPv6Address(start))
+
+
+def _families(aggr, setname_ipv4, setname_ipv6):
+    """List families to write.
+
+    Returns:
+        list: (setname, iterator of aggregated ranges, str function, family)
+
+    """
+    families = []
+    if setname_ipv4:
+        families.append((setname_ipv4, aggr.iter_aggregated_ipv4,
+                         _str_ipv4, 4))
+    if setname_ipv6:
+        families.append((setname_ipv6, aggr.iter_aggregated_ipv6,
+                         _str_ipv6, 6))
+    return families
+
+
+def write_text(fd, aggr):
+    """Write aggregated ranges one per line.
+
+    Args:
+        fd(file): Text mode file object.
+        aggr(IPRangeAggregation): Aggregation result.
+
+    """
+    for (start, prefixlen) in aggr.iter_aggregated_ipv4():
+        fd.write('{}/{}\n'.format(_str_ipv4(start), prefixlen))
+    for (start, prefixlen) in aggr.iter_aggregated_ipv6():
+        fd.write('{}/{}\n'.format(_str_ipv6(start), prefixlen))
+
+
+def write_ipset(fd, aggr, setname_ipv4, setname_ipv6=None):
+    """Write batch file for 'ipset restore'.
+    Sets are created as hash:net if not exist.
+
+    Args:
+        fd(file): Text mode file object.
+        aggr(IPRangeAggregation): Aggregation result.
+        setname_ipv4(str): Set name for IPv4, None for skip.
+        setname_ipv6(str): Set name for IPv6, None for skip.
+
+    """
+    for (setname, iterator, to_str, family) in _families(
+            aggr, setname_ipv4, setname_ipv6):
+        count = sum(1 for _ in iterator())
+        fd.write('create {} hash:net family {} maxelem {} -exist\n'.format(
+            setname, 'inet' if family == 4 else 'inet6',
+            max(count, 65536)))
+        for (start, prefixlen) in iterator():
+            fd.write('add {} {}/{} -exist\n'.format(
+                setname, to_str(start), prefixlen))
+
+
+def write_nft(fd, aggr, setname_ipv4, setname_ipv6=None,
+              table='inet filter'):
+    """Write nft script adding set elements in blocks.
+    Table and interval sets are added if not exist.
+
+    Args:
+        fd(file): Text mode file object.
+        aggr(IPRangeAggregation): Aggregation result.
+        setname_ipv4(str): Set name for IPv4, None for skip.
+        setname_ipv6(str): Set name for IPv6, None for skip.
+        table(str): Family and name of table, default: 'inet filter'.
+
+    """
+    fd.write('add table {}\n'.format(table))
+    for (setname, iterator, to_str, family) in _families(
+            aggr, setname_ipv4, setname_ipv6):
+        fd.write('add set {} {} {{ type {}; flags interval; }}\n'.format(
+            table, setname, 'ipv4_addr' if family == 4 else 'ipv6_addr'))
+
+        num = 0
+        for (start, prefixlen) in iterator():
+            if num % NFT_CHUNK == 0:
+                if num:
+                    fd.write(' }\n')
+                fd.write('add element {} {} {{ '.format(table, setname))
+            else:
+                fd.write(', ')
+            fd.write('{}/{}'.format(to_str(start), prefixlen))
+            num += 1
+        if num:
+            fd.write(' }\n')
+
+
+def write_binary(fd, aggr):
+    """Write packed records.
+    Record is tag byte(4 or 6), big endian network address
+    and prefix length byte.
+
+    Args:
+        fd(file): Binary mode file object.
+        aggr(IPRangeAggregation): Aggregation result.
+
+    """
+    pack = RECORD_IPV4.pack
+    for (start, prefixlen) in aggr.iter_aggregated_ipv4():
+        fd.write(pack(4, start.to_bytes(4, 'big'), prefixlen))
+    pack = RECORD_IPV6.pack
+    for (start, prefixlen) in aggr.iter_aggregated_ipv6():
+        fd.write(pack(6, start.to_bytes(16, 'big'), prefixlen))
+
+
+def read_binary(fd):
+    """Read records written by write_binary.
+
+    Args:
+        fd(file): Binary mode file object.
+
+    Yields:
+        tuple: (family, network address as int, prefix length).
+
+    """
+    while True:
+        tag = fd.read(1)
+        if not tag:
+            break
+        if tag[0] == 4:
+            record = RECORD_IPV4
+        elif tag[0] == 6:
+            record = RECORD_IPV6
+        else:
+            raise ValueError('Invalid record tag: {}'.format(tag[0]))
+        data = tag + fd.read(record.size - 1)
+        if len(data) != record.size:
+            raise ValueError('Truncated record.')
+        (family, address, prefixlen) = record.unpack(data)
+        yield (family, int.from_bytes(address, 'big'), prefixlen)
@@ -1,12 +1,160 @@
 import ipaddress
 import os
+import sys
 import glob
 import re
+import json
+import bisect
+import heapq
 import pickle
 import hashlib
 from tools import str2network
 
 
+MATCH_TYPES = ('match', 'included', 'include')
+
+REGEX_IP = re.compile(r'[\d\.:]+(/\d{1,3}){0,1}')
+
+# Summary format version in cache header.
+# Older headers are summarized again from segments.
+SUMMARY_VERSION = 2
+
+# IPv6 summary buckets are /16 in global unicast(2000::/3),
+# and one more bucket for all other space.
+BUCKET_IPV6_START = 0x2000 << 112
+BUCKET_IPV6_END = (0x4000 << 112) - 1
+BUCKET_IPV6_OTHER = 0x2000
+
+
+def _parse_ipv4(string):
+    """Parse IPv4 address or network to integers, same rule as str2network.
+
+    Returns:
+        tuple: (network address as int, prefix length), None for invalid.
+
+    """
+    (address, _, prefix) = string.partition('/')
+    octets = address.split('.')
+    if len(octets) != 4:
+        return None
+    start = 0
+    for octet in octets:
+        if not (octet.isascii() and octet.isdigit()) or len(octet) > 3 or \
+                (len(octet) > 1 and octet[0] == '0'):
+            return None
+        value = int(octet)
+        if value > 255:
+            return None
+        start = start << 8 | value
+
+    prefixlen = 32
+    if prefix:
+        if not (prefix.isascii() and prefix.isdigit()):
+            return None
+        prefixlen = int(prefix)
+        if prefixlen > 32:
+            return None
+    if start & ((1 << (32 - prefixlen)) - 1):
+        return None
+    return (start, prefixlen)
+
+
+def parse_line_int(line):
+    """Find networks in one line as integers.
+    IPv4 is parsed without building network instance.
+
+    Args:
+        line(str): Stripped line.
+
+    Yields:
+        tuple: (col, version, network address as int, prefix length)
+
+    """
+    for candidate in REGEX_IP.finditer(line):
+        string = candidate.group()
+        if string.count('.') == 3 and ':' not in string:
+            parsed = _parse_ipv4(string)
+            if parsed:
+                yield (candidate.start(), 4) + parsed
+            continue
+
+        # Case: Can not be IPv6 address, skip costly parse.
+        if '::' not in string and string.count(':') < 6:
+            continue
+        try:
+            network = str2network(string)
+        except:
+            continue
+        yield (candidate.start(), network.version,
+               int(network.network_address), network.prefixlen)
+
+
+def parse_line(line):
+    """Find networks in one line.
+
+    Args:
+        line(str): Stripped line.
+
+    Yields:
+        tuple: (col, IPv4Network or IPv6Network)
+
+    """
+    for (col, version, start, prefixlen) in parse_line_int(line):
+        if version == 4:
+            yield (col, ipaddress.IPv4Network((start, prefixlen)))
+        else:
+            yield (col, ipaddress.IPv6Network((start, prefixlen)))
+
+
+def find_match_type(keyword, target, match_type=None):
+    """Decide how target relates to keyword.
+    Checks for other types are skipped when match_type is given.
+
+    Args:
+        keyword(IPv4Network or IPv6Network): Search keyword.
+        target(IPv4Network or IPv6Network): Network found in text.
+        match_type(str): Find specific type only, default: None.
+
+    Output:
+        str: 'match', 'included', 'include' or None.
+
+    """
+    if keyword == target:
+        found = 'match'
+    elif match_type == 'match':
+        return None
+    elif match_type != 'include' and keyword.subnet_of(target):
+        found = 'included'
+    elif match_type != 'included' and target.subnet_of(keyword):
+        found = 'include'
+    else:
+        return None
+
+    if match_type and found != match_type:
+        return None
+    return found
+
+
+def _bucket_mask(start, end, version):
+    """Bitmap of summary buckets overlapped by address range.
+    Buckets are /8 for IPv4, and /16 in 2000::/3 for IPv6.
+
+    """
+    if version == 4:
+        low = start >> 24
+        high = end >> 24
+        return ((1 << (high - low + 1)) - 1) << low
+
+    mask = 0
+    low = max(start, BUCKET_IPV6_START) >> 112
+    high = min(end, BUCKET_IPV6_END) >> 112
+    if low <= high:
+        mask = ((1 << (high - low + 1)) - 1) << (low - 0x2000)
+    if start < BUCKET_IPV6_START or BUCKET_IPV6_END < end:
+        mask |= 1 << BUCKET_IPV6_OTHER
+    return mask
+
+
 class CompiledFiles():
     """Group of CompiledFile.
 
@@ -16,6 +164,13 @@ class CompiledFiles():
     Args:
         filenames(list): List of target filenames and directory names.
 
+    Note:
+        Cache manifest(manifest.json in cachedir) keeps md5 and header
+        of each file by path, size and mtime.
+        Unchanged files are neither read nor hashed,
+        and summaries in header skip files which can not match.
+        Entries of files deleted under target paths are dropped.
+
     """
     def __init__(self, filenames, cachedir="~/.ipgrep"):
         self.compiledfiles = self._compile(filenames, cachedir)
@@ -41,17 +196,69 @@ class CompiledFiles():
             elif os.path.isfile(filename):
                 candidates += [filename]
 
+        manifestpath = os.path.join(
+                os.path.expanduser(cachedir), 'manifest.json')
+        manifest = {}
+        if os.path.isfile(manifestpath):
+            with open(manifestpath, 'r') as fd:
+                manifest = json.load(fd)
+
+        updated = False
         compiledfiles = []
         for candidate in candidates:
-            compiledfiles.append(CompiledFile(candidate, cachedir))
+            path = os.path.abspath(candidate)
+            stat = os.stat(candidate)
+            entry = manifest.get(path)
+            if entry and entry['size'] == stat.st_size and \
+                    entry['mtime'] == stat.st_mtime_ns and \
+                    entry['header'].get('summary_version') == SUMMARY_VERSION:
+                compiledfiles.append(CompiledFile(
+                    candidate, cachedir,
+                    md5=entry['md5'], header=entry['header']))
+                continue
+
+            compiledfile = CompiledFile(candidate, cachedir)
+            compiledfiles.append(compiledfile)
+            manifest[path] = {
+                'size': stat.st_size,
+                'mtime': stat.st_mtime_ns,
+                'md5': compiledfile.md5,
+                'header': compiledfile.header}
+            updated = True
+
+        # Case: Deleted files under scanned roots, drop from manifest.
+        scanneds = set(os.path.abspath(candidate) for candidate in candidates)
+        roots = [os.path.abspath(filename) for filename in filenames]
+        for path in list(manifest.keys()):
+            if path in scanneds:
+                continue
+            if any(path == root or path.startswith(os.path.join(root, ''))
+                   for root in roots):
+                del manifest[path]
+                updated = True
+
+        if updated:
+            with open(manifestpath + '.tmp', 'w') as fd:
+                json.dump(manifest, fd)
+            os.replace(manifestpath + '.tmp', manifestpath)
 
         return compiledfiles
 
+    def _keyword(self, iprange_str, match_type):
+        """Network for single keyword, StreamMatcher for list of them.
+
+        """
+        if isinstance(iprange_str, (list, tuple)):
+            return StreamMatcher(iprange_str, match_type=match_type)
+        return str2network(iprange_str)
+
     def grep(self, iprange_str, match_type=None):
         """ Find input ipaddress in compiled files.
 
         Args:
-            iprange_str(str): String format ip address.
+            iprange_str(str or list): String format ip address.
+                List of them is searched at once, same as stream mode.
+            match_type(str): Find specific type only, default: None.
 
         Output:
             list: List of found points in target files.
@@ -59,35 +266,80 @@ class CompiledFiles():
         """
 
         results = []
-        network = str2network(iprange_str)
+        network = self._keyword(iprange_str, match_type)
 
         for compiledfile in self.compiledfiles:
-            results += compiledfile.grep(network)
-
-        if match_type:
-            results = [result for result in results
-                        if result['match_type'] == match_type]
+            results += compiledfile.grep(network, match_type)
 
         return results
 
-    def print(self, keyword, verbose=False, match_type=None):
+    def count(self, iprange_str, match_type=None):
+        """ Count found points per file, without collecting them.
+
+        Args:
+            iprange_str(str or list): String format ip address.
+            match_type(str): Count specific type only, default: None.
+
+        Output:
+            list: List of (filename, dict of match type to count).
+
+        """
+        network = self._keyword(iprange_str, match_type)
+        return [(compiledfile.filename,
+                 compiledfile.count(network, match_type))
+                for compiledfile in self.compiledfiles]
+
+    def files_with_matches(self, iprange_str, match_type=None):
+        """ Find files with at least one found point.
+
+        Args:
+            iprange_str(str or list): String format ip address.
+            match_type(str): Find specific type only, default: None.
+
+        Output:
+            list: List of filenames.
+
+        """
+        network = self._keyword(iprange_str, match_type)
+        return [compiledfile.filename
+                for compiledfile in self.compiledfiles
+                if compiledfile.has_match(network, match_type)]
+
+    def print(self, keyword, verbose=False, match_type=None, mode=None):
         """Print grep result on stdout.
 
         Args:
-            keyword(str): Network to search.
+            keyword(str or list): Network to search.
+                List of them is searched at once, same as stream mode.
             verbose(bool): Show verbose or not, default: False.
             match_type(str): Show specific type only.
                 match: Show exact matched IP string only.
                 included: Show IP string which include keyword range.
                 include: Show IP string which is included in kyeword range.
                 Default: None
+            mode(str): Output mode.
+                count: Show found number per file and match type.
+                files: Show filenames with found points only.
+                Default: None, show found points.
 
         """
-        results = self.grep(keyword)
+        if mode == 'count':
+            for (filename, counts) in self.count(keyword, match_type):
+                if match_type:
+                    print('{}:{}'.format(filename, counts[match_type]))
+                else:
+                    print('{}:{}'.format(filename, ','.join(
+                        '{}={}'.format(found, num)
+                        for (found, num) in counts.items())))
+            return
+
+        if mode == 'files':
+            for filename in self.files_with_matches(keyword, match_type):
+                print(filename)
+            return
+
+        results = self.grep(keyword, match_type)
         for result in results:
-            if match_type:
-                if result['match_type'] != match_type:
-                    continue
             if verbose:
                 print('{}:{},{}:{}'.format(
                     result['filename'],
@@ -100,6 +352,140 @@ class CompiledFiles():
                     result['row'], result['col']))
 
 
+class StreamMatcher():
+    """Precompiled matcher of many keywords for streaming input.
+    No cache is used, lines are parsed and matched one by one.
+
+    Keywords containing target are looked up by hash per prefix length,
+    and keywords contained in target by binary search on sorted starts.
+    When several keywords hit, match type is reported in order of
+    'match', 'included' and 'include'.
+
+    Args:
+        iprange_strs(list): List of string format networks to search.
+        match_type(str): Find specific type only, default: None.
+
+    """
+    def __init__(self, iprange_strs, match_type=None):
+        self.match_type = match_type
+        self.keywords = []
+        self._families = {}
+        for iprange_str in iprange_strs:
+            keyword = str2network(iprange_str)
+            self.keywords.append(keyword)
+            family = self._families.setdefault(
+                    keyword.version, ({}, []))
+            start = int(keyword.network_address)
+            shift = keyword.max_prefixlen - keyword.prefixlen
+            family[0].setdefault(keyword.prefixlen, set()).add(start >> shift)
+            family[1].append((start, keyword.prefixlen))
+
+        for (version, (starts, keys)) in self._families.items():
+            keys.sort()
+            self._families[version] = (sorted(starts.items()), keys)
+
+    def find(self, target):
+        """Decide how target relates to keywords.
+
+        Args:
+            target(IPv4Network or IPv6Network): Network found in text.
+
+        Output:
+            str: 'match', 'included', 'include' or None.
+
+        """
+        return self.find_int(target.version, int(target.network_address),
+                             target.prefixlen)
+
+    def find_int(self, version, start, prefixlen):
+        """Decide how target given as integers relates to keywords.
+
+        Args:
+            version(int): 4 or 6.
+            start(int): Network address of target.
+            prefixlen(int): Prefix length of target.
+
+        Output:
+            str: 'match', 'included', 'include' or None.
+
+        """
+        family = self._families.get(version)
+        if not family:
+            return None
+        (starts, keys) = family
+        match_type = self.match_type
+        bits = 32 if version == 4 else 128
+
+        # Case: Keywords containing target.
+        containing = False
+        for (keyword_prefixlen, keyword_starts) in starts:
+            if keyword_prefixlen > prefixlen:
+                break
+            if start >> (bits - keyword_prefixlen) in keyword_starts:
+                if keyword_prefixlen < prefixlen:
+                    containing = True
+                elif match_type in (None, 'match'):
+                    return 'match'
+
+        # Case: Keywords contained in target.
+        if match_type in (None, 'included'):
+            end = start + (1 << (bits - prefixlen)) - 1
+            index = bisect.bisect_left(keys, (start, prefixlen + 1))
+            if index < len(keys) and keys[index][0] <= end:
+                return 'included'
+
+        if containing and match_type in (None, 'include'):
+            return 'include'
+        return None
+
+    def grep_stream(self, fd_in, fd_out, verbose=False, mode=None,
+                    label='(standard input)'):
+        """Search keywords in stream line by line.
+        Output is flushed after each line with found points.
+
+        Args:
+            fd_in(file): Text mode input stream.
+            fd_out(file): Text mode output stream.
+            verbose(bool): Show verbose or not, default: False.
+            mode(str): Output mode, same as CompiledFiles.print.
+            label(str): Name shown as filename.
+
+        """
+        counts = {found: 0 for found in MATCH_TYPES}
+        for row, line in enumerate(fd_in, 1):
+            line = line.strip()
+            printed = False
+            for (col, version, start, prefixlen) in parse_line_int(line):
+                found = self.find_int(version, start, prefixlen)
+                if not found:
+                    continue
+                if mode == 'count':
+                    counts[found] += 1
+                elif mode == 'files':
+                    fd_out.write('{}\n'.format(label))
+                    fd_out.flush()
+                    return
+                elif verbose:
+                    fd_out.write('{}:{},{}:{}\n'.format(
+                        label, row, col, line))
+                    printed = True
+                else:
+                    fd_out.write('{}:{},{}\n'.format(label, row, col))
+                    printed = True
+            if printed:
+                fd_out.flush()
+
+        if mode == 'count':
+            if self.match_type:
+                fd_out.write('{}:{}\n'.format(
+                    label, counts[self.match_type]))
+            else:
+                fd_out.write('{}:{}\n'.format(label, ','.join(
+                    '{}={}'.format(found, num)
+                    for (found, num) in counts.items())))
+        fd_out.flush()
+
+
 class CompiledFile():
     """Compiled iprange data from target file.
 
@@ -108,6 +494,12 @@ class CompiledFile():
 
         readable(bool): True for compiled, False for not compiled by format unmatch.
 
+        counts(dict): Record number per family, {'ipv4': <int>, 'ipv6': <int>}
+
+        summaries(dict): Address summary per family, None for empty family.
+           Format: [<min address>, <max address>, <bitmap of buckets>]
+           Buckets are /8 for IPv4, and /16 in 2000::/3 for IPv6.
+
         _network_attrs_ipv4(list): List of dict format network instance.
            Dict format:
              {
@@ -120,33 +512,91 @@ class CompiledFile():
         _network_attrs_ipv6(list): List of dict format network instance.
            Format is same as v4
 
+        Records are loaded from cache per family when first accessed.
+
     Args:
         filename(str): Search target file name.
+        cachedir(str): File path to save cached data.
+        md5(str): Known md5 of file, default: None.
+        header(dict): Known cache header of file, default: None.
+            File is not read when both md5 and header are given.
 
     """
-    def __init__(self, filename, cachedir):
+    def __init__(self, filename, cachedir, md5=None, header=None):
         self.filename = filename
         self.cachedir = cachedir
-        compiled = self._compile(filename)
-
-        if compiled:
-            self.readable = True
-            self._network_attrs_ipv4 = compiled[0]
-            self._network_attrs_ipv6 = compiled[1]
+        self._segments = {}
+        if md5 and header:
+            self.md5 = md5
+            self._cachepath = os.path.join(
+                    os.path.expanduser(cachedir), md5)
         else:
-            self.readable = False
-            self._network_attrs_ipv4 = []
-            self._network_attrs_ipv6 = []
+            header = self._compile(filename)
+
+        self.header = header
+        self.readable = header['readable']
+        self.counts = {'ipv4': header['ipv4'], 'ipv6': header['ipv6']}
+        self.summaries = header.get('summaries')
+
+    @property
+    def _network_attrs_ipv4(self):
+        return self._load_segment('ipv4')
+
+    @property
+    def _network_attrs_ipv6(self):
+        return self._load_segment('ipv6')
+
+    def _load_segment(self, family):
+        """Load cached records of one family on first access.
+        Empty segment is not saved, so it is never opened.
+
+        Args:
+            family(str): 'ipv4' or 'ipv6'.
+
+        Returns:
+            list: List of dict format network instance.
+
+        """
+        if family not in self._segments:
+            if self.counts[family]:
+                with open(self._cachepath + '.' + family, 'rb') as fd:
+                    self._segments[family] = pickle.load(fd)
+            else:
+                self._segments[family] = []
+        return self._segments[family]
 
     def cache(func):
         """Decorator to cache compiled data.
+        Cache is saved as header with record counts,
+        and IPv4 and IPv6 segments loaded separately.
 
         Note:
             Args of function must be filename string only.
+
+        Returns:
+            dict: Header, {'readable': <bool>, 'ipv4': <int>, 'ipv6': <int>,
+                           'summaries': {'ipv4': <list>, 'ipv6': <list>},
+                           'summary_version': <int>}
         """
+        def summarize(segment):
+            if not segment:
+                return None
+            version = segment[0]['network'].version
+            (minimum, maximum, bitmap) = (None, None, 0)
+            for network_attr in segment:
+                network = network_attr['network']
+                start = int(network.network_address)
+                end = int(network.broadcast_address)
+                if minimum is None or start < minimum:
+                    minimum = start
+                if maximum is None or end > maximum:
+                    maximum = end
+                bitmap |= _bucket_mask(start, end, version)
+            return [minimum, maximum, bitmap]
+
         def check_hash(filename):
-            fd = open(filename, 'rb')
-            md5 = hashlib.md5(fd.read()).hexdigest()
+            with open(filename, 'rb') as fd:
+                md5 = hashlib.md5(fd.read()).hexdigest()
             return md5
 
         def wrapper(*args, **kwargs):
@@ -165,18 +615,52 @@ class CompiledFile():
 
             md5 = check_hash(filename)
             cachepath = os.path.join(cachedir, md5)
-
-            data = None
-            if os.path.isfile(cachepath):
-                with open(cachepath, 'rb') as fd:
-                    data = pickle.load(fd)
+            self.md5 = md5
+            self._cachepath = cachepath
+
+            header = None
+            if os.path.isfile(cachepath + '.header'):
+                with open(cachepath + '.header', 'r') as fd:
+                    header = json.load(fd)
+                if header.get('summary_version') == SUMMARY_VERSION:
+                    return header
+
+                # Case: Older summary format, summarize segments again.
+                summaries = {}
+                for family in ['ipv4', 'ipv6']:
+                    segment = []
+                    if header[family]:
+                        with open(cachepath + '.' + family, 'rb') as fd:
+                            segment = pickle.load(fd)
+                    self._segments[family] = segment
+                    summaries[family] = summarize(segment)
+                header['summaries'] = summaries
             else:
                 data = func(*args)
                 if not os.path.isdir(cachedir):
                     os.makedirs(cachedir)
-                with open(cachepath, 'wb') as fd:
-                    pickle.dump(data, fd)
-            return data
+                header = {'readable': data is not None,
+                          'ipv4': 0, 'ipv6': 0,
+                          'summaries': {'ipv4': None, 'ipv6': None}}
+                if data:
+                    for (family, segment) in zip(['ipv4', 'ipv6'], data):
+                        header[family] = len(segment)
+                        header['summaries'][family] = summarize(segment)
+                        self._segments[family] = segment
+                        if not segment:
+                            continue
+                        with open(cachepath + '.' + family + '.tmp',
+                                  'wb') as fd:
+                            pickle.dump(segment, fd)
+                        os.replace(cachepath + '.' + family + '.tmp',
+                                   cachepath + '.' + family)
+
+            header['summary_version'] = SUMMARY_VERSION
+            # Header is written last, segments are ready when found.
+            with open(cachepath + '.header.tmp', 'w') as fd:
+                json.dump(header, fd)
+            os.replace(cachepath + '.header.tmp', cachepath + '.header')
+            return header
 
         return wrapper
 
@@ -189,67 +673,159 @@ class CompiledFile():
 
         network_attrs_ipv4 = []
         network_attrs_ipv6 = []
-        regex_ip = r'[\d\.:]+(/\d{1,3}){0,1}'
         for row, line in enumerate(fd, 1):
             line = line.strip()
-            candidates = re.finditer(regex_ip, line)
-            for candidate in candidates:
-                try:
-                    network = str2network(candidate.group())
-                except:
-                    continue
-
+            for (col, network) in parse_line(line):
                 if isinstance(network, ipaddress.IPv4Network):
                     network_attrs_ipv4.append({
                         'filename': filename,
                         'network': network,
                         'row': row,
-                        'col': candidate.span()[0],
-                        'string': candidate.string})
+                        'col': col,
+                        'string': line})
 
                 if isinstance(network, ipaddress.IPv6Network):
                     network_attrs_ipv6.append({
                         'filename': filename,
                         'network': network,
                         'row': row,
-                        'col': candidate.span()[0],
-                        'string': candidate.string})
+                        'col': col,
+                        'string': line})
         return (network_attrs_ipv4, network_attrs_ipv6)
 
-    def grep(self, keyword):
-        """Search keyword ip address or network in self.
+    def may_contain(self, keyword):
+        """Check keyword can match in self by summary, without records.
 
         Args:
             keyword(IPv4Network or IPv6Network): Search keyword.
 
         Output:
-            list: List of found location of keyword.
+            bool: False when no record can match.
 
         """
-        network_attrs = []
+        family = 'ipv4' if keyword.version == 4 else 'ipv6'
+        if not self.counts[family]:
+            return False
+        if not self.summaries:
+            return True
+
+        (minimum, maximum, bitmap) = self.summaries[family]
+        start = int(keyword.network_address)
+        end = int(keyword.broadcast_address)
+        if end < minimum or maximum < start:
+            return False
+        return bool(bitmap & _bucket_mask(start, end, keyword.version))
+
+    def _iter_matches(self, keyword, match_type=None):
+        """Iterate found records of keyword without copying them.
+
+        Args:
+            keyword(IPv4Network, IPv6Network or StreamMatcher):
+                Search keyword.
+            match_type(str): Find specific type only, default: None.
+                Ignored for StreamMatcher, which has own match type.
+
+        Yields:
+            tuple: (dict format network instance, match type)
+
+        """
+        if isinstance(keyword, StreamMatcher):
+            yield from self._iter_matcher_matches(keyword)
+            return
+        if not self.may_contain(keyword):
+            return
         if isinstance(keyword, ipaddress.IPv4Network):
             network_attrs = self._network_attrs_ipv4
-        elif isinstance(keyword, ipaddress.IPv6Network):
+        else:
             network_attrs = self._network_attrs_ipv6
 
-        results = []
         for network_attr in network_attrs:
-            match_type = None
-            target = network_attr['network']
-            if keyword == target:
-                match_type = "match"
-            elif keyword.subnet_of(target):
-                match_type = "included"
-            elif target.subnet_of(keyword):
-                match_type = "include"
-
-            if match_type:
-                result = network_attr.copy()
-                result['match_type'] = match_type
-                results.append(result)
+            found = find_match_type(keyword, network_attr['network'],
+                                    match_type)
+            if found:
+                yield (network_attr, found)
+
+    def _iter_matcher_matches(self, matcher):
+        """Iterate found records of any keyword in file order,
+        each record once, same as StreamMatcher.grep_stream.
+
+        Args:
+            matcher(StreamMatcher): Search keywords.
+
+        Yields:
+            tuple: (dict format network instance, match type)
+
+        """
+        segments = []
+        for family in ['ipv4', 'ipv6']:
+            version = 4 if family == 'ipv4' else 6
+            if any(self.may_contain(keyword) for keyword in matcher.keywords
+                   if keyword.version == version):
+                segments.append(self._load_segment(family))
+
+        for network_attr in heapq.merge(
+                *segments,
+                key=lambda network_attr: (network_attr['row'],
+                                          network_attr['col'])):
+            found = matcher.find(network_attr['network'])
+            if found:
+                yield (network_attr, found)
+
+    def grep(self, keyword, match_type=None):
+        """Search keyword ip address or network in self.
+
+        Args:
+            keyword(IPv4Network, IPv6Network or StreamMatcher):
+                Search keyword.
+            match_type(str): Find specific type only, default: None.
+
+        Output:
+            list: List of found location of keyword.
+
+        """
+        results = []
+        for (network_attr, found) in self._iter_matches(keyword, match_type):
+            result = network_attr.copy()
+            # Cached record is shared by files with same content.
+            result['filename'] = self.filename
+            result['match_type'] = found
+            results.append(result)
 
         return results
 
+    def count(self, keyword, match_type=None):
+        """Count found location of keyword per match type.
+
+        Args:
+            keyword(IPv4Network, IPv6Network or StreamMatcher):
+                Search keyword.
+            match_type(str): Count specific type only, default: None.
+
+        Output:
+            dict: Match type to count.
+
+        """
+        counts = {found: 0 for found in MATCH_TYPES}
+        for (_, found) in self._iter_matches(keyword, match_type):
+            counts[found] += 1
+        return counts
+
+    def has_match(self, keyword, match_type=None):
+        """Check keyword is found or not, stop at first found location.
+
+        Args:
+            keyword(IPv4Network, IPv6Network or StreamMatcher):
+                Search keyword.
+            match_type(str): Find specific type only, default: None.
+
+        Output:
+            bool: True for found.
+
+        """
+        for _ in self._iter_matches(keyword, match_type):
+            return True
+        return False
+
 
 if __name__ == '__main__':
     import argparse
@@ -262,15 +838,44 @@ if __name__ == '__main__':
     parser.add_argument('filenames',
                         nargs='*',
                         default=[],
-                        help='Target files and directories to search.')
+                        help='Target files and directories to search. ' +
+                             'Read stdin without cache when none or "-".')
+    parser.add_argument('-e',
+                        action='append',
+                        default=[],
+                        help='Additional network to search, repeatable')
     parser.add_argument('-m',
                         default=None,
+                        choices=MATCH_TYPES,
                         help='Match type, <match, included, include>')
     parser.add_argument('-v',
                         action='store_true',
                         help='Show result details')
+    parser.add_argument('-c',
+                        action='store_const',
+                        dest='mode',
+                        const='count',
+                        help='Show found number per file and match type')
+    parser.add_argument('-l',
+                        action='store_const',
+                        dest='mode',
+                        const='files',
+                        help='Show filenames with found points only')
     args = parser.parse_args()
 
     # Run
+    networks = [args.network] + args.e
+    if not args.filenames or args.filenames == ['-']:
+        matcher = StreamMatcher(networks, match_type=args.m)
+        try:
+            matcher.grep_stream(sys.stdin, sys.stdout, verbose=args.v,
+                                mode=args.mode)
+        except BrokenPipeError:
+            # Case: Reader closed pipe, ex.) head.
+            os.dup2(os.open(os.devnull, os.O_WRONLY), sys.stdout.fileno())
+        sys.exit(0)
+
     compiledfiles = CompiledFiles(args.filenames)
-    compiledfiles.print(args.network, match_type=args.m, verbose=args.v)
+    keyword = networks if args.e else args.network
+    compiledfiles.print(keyword, match_type=args.m, verbose=args.v,
+                        mode=args.mode)
@@ -0,0 +1,195 @@
+import bisect
+import ipaddress
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+
+class LookupTable():
+    """Longest prefix match table compiled from labelled aggregations.
+
+    Prefixes of all labels are flattened into sorted, non overlapping
+    segments once, so each lookup is a single binary search.
+    Table is immutable after compile.
+
+    Args:
+        aggregations(dict): Label to aggregation result.
+            Values are IPRangeAggregation or any object
+            with iter_aggregated_ipv4() and iter_aggregated_ipv6().
+            When same network exists in several labels, first label wins.
+
+    Attributes:
+        labels(tuple): Labels in compiled order.
+
+    """
+    def __init__(self, aggregations):
+        entries_ipv4 = []
+        entries_ipv6 = []
+        for order, (label, aggr) in enumerate(aggregations.items()):
+            for (start, prefixlen) in aggr.iter_aggregated_ipv4():
+                entries_ipv4.append((start, prefixlen, order, label))
+            for (start, prefixlen) in aggr.iter_aggregated_ipv6():
+                entries_ipv6.append((start, prefixlen, order, label))
+
+        self.labels = tuple(aggregations.keys())
+        (self._starts_ipv4, self._values_ipv4) = self._compile(
+                entries_ipv4, ipaddress.IPv4Network, 32)
+        (self._starts_ipv6, self._values_ipv6) = self._compile(
+                entries_ipv6, ipaddress.IPv6Network, 128)
+
+        if numpy is not None:
+            self._starts_ipv4_array = numpy.array(
+                    self._starts_ipv4, dtype=numpy.uint64)
+            self._values_ipv4_array = numpy.empty(
+                    len(self._values_ipv4), dtype=object)
+            self._values_ipv4_array[:] = self._values_ipv4
+
+    def _compile(self, entries, network_class, bits):
+        """Flatten nested prefixes into segments.
+
+        Args:
+            entries(list): List of (start, prefixlen, order, label).
+            network_class(type): IPv4Network or IPv6Network.
+            bits(int): Address length.
+
+        Returns:
+            tuple: (segment start addresses, segment results).
+                Segment result is (label, network) of most specific
+                prefix covering the segment, or None.
+
+        """
+        starts = [0]
+        indexes = [-1]
+
+        def emit(position, index):
+            if position >= 1 << bits:
+                return
+            if starts[-1] == position:
+                indexes[-1] = index
+                if len(indexes) > 1 and indexes[-2] == index:
+                    starts.pop()
+                    indexes.pop()
+            elif indexes[-1] != index:
+                starts.append(position)
+                indexes.append(index)
+
+        entries.sort()
+        results = []
+        stack = []
+        for (start, prefixlen, order, label) in entries:
+            end = start + (1 << (bits - prefixlen)) - 1
+            while stack and stack[-1][1] < start:
+                (_, popped_end, _) = stack.pop()
+                emit(popped_end + 1, stack[-1][2] if stack else -1)
+
+            # Case: Same network in former label.
+            if stack and stack[-1][0] == start and stack[-1][1] == end:
+                continue
+
+            results.append((label, network_class((start, prefixlen))))
+            stack.append((start, end, len(results) - 1))
+            emit(start, len(results) - 1)
+
+        while stack:
+            (_, popped_end, _) = stack.pop()
+            emit(popped_end + 1, stack[-1][2] if stack else -1)
+
+        values = tuple(results[index] if index >= 0 else None
+                       for index in indexes)
+        return (tuple(starts), values)
+
+    def lookup(self, address):
+        """Find most specific prefix containing address.
+
+        Args:
+            address(str, IPv4Address or IPv6Address): Address to classify.
+
+        Returns:
+            tuple: (label, network), None for no match.
+
+        """
+        if isinstance(address, str):
+            address = ipaddress.ip_address(address.strip())
+
+        if address.version == 4:
+            (starts, values) = (self._starts_ipv4, self._values_ipv4)
+        else:
+            (starts, values) = (self._starts_ipv6, self._values_ipv6)
+        return values[bisect.bisect_right(starts, int(address)) - 1]
+
+    def lookup_batch(self, addresses):
+        """Classify many addresses.
+
+        Args:
+            addresses(iterable): Addresses in str or ipaddress format.
+                IPv4 and IPv6 can be mixed.
+
+        Returns:
+            list: Result of lookup() for each address, in input order.
+
+        """
+        results = []
+        for address in addresses:
+            results.append(self.lookup(address))
+        return results
+
+    def lookup_batch_ipv4(self, addresses):
+        """Classify many IPv4 addresses given as integers.
+        Vectorized with numpy.searchsorted when numpy is installed.
+
+        Args:
+            addresses(iterable): IPv4 addresses as int,
+                or numpy integer array.
+
+        Returns:
+            list: Result of lookup() for each address, in input order.
+
+        """
+        if numpy is not None:
+            addresses = numpy.asarray(addresses, dtype=numpy.uint64)
+            indexes = numpy.searchsorted(
+                    self._starts_ipv4_array, addresses, side='right') - 1
+            return self._values_ipv4_array[indexes].tolist()
+
+        starts = self._starts_ipv4
+        values = self._values_ipv4
+        return [values[bisect.bisect_right(starts, address) - 1]
+                for address in addresses]
+
+
+if __name__ == '__main__':
+    import sys
+    import argparse
+    from ipaggr import IPRangeAggregation
+
+    # Parser
+    parser = argparse.ArgumentParser()
+    parser.add_argument('sources',
+                        nargs='+',
+                        help='Labelled range lists, ex.) aws=./aws.txt')
+    parser.add_argument('-f', '--file',
+                        default=None,
+                        help='Address list to classify. Default: stdin')
+    args = parser.parse_args()
+
+    # Run
+    aggregations = {}
+    for source in args.sources:
+        (label, _, filename) = source.partition('=')
+        with open(filename or label, 'r') as fd:
+            aggregations[label] = IPRangeAggregation(
+                    fd.readlines(), ignore_invalid=True)
+    table = LookupTable(aggregations)
+
+    fd = open(args.file, 'r') if args.file else sys.stdin
+    for line in fd:
+        address = line.strip()
+        if not address:
+            continue
+        result = table.lookup(address)
+        if result:
+            print('{} {} {}'.format(address, result[0], result[1]))
+        else:
+            print('{} - -'.format(address))
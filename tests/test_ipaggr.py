@@ -0,0 +1,190 @@
+import os
+import sys
+import random
+import tempfile
+import ipaddress
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import ipaggr
+from ipaggr import IPRangeAggregation
+
+
+def generate_ranges(seed, num):
+    """Generate ranges around shard boundaries.
+    Short prefixes covering shards, whole shards in pieces
+    and long prefixes in few /8 are mixed.
+
+    """
+    rand = random.Random(seed)
+    ranges = []
+    for _ in range(num):
+        prefixlen = rand.choice([rand.randint(4, 10), rand.randint(14, 32),
+                                 rand.randint(20, 32)])
+        address = rand.choice([10, 11, 12, 13, 200, 201]) << 24 \
+            | rand.getrandbits(24)
+        address &= ~((1 << (32 - prefixlen)) - 1) & 0xffffffff
+        ranges.append(str(ipaddress.IPv4Network((address, prefixlen))))
+    ranges += ['50.{}.0.0/14'.format(num) for num in range(0, 256, 4)]
+    ranges += ['51.0.0.0/9', '51.128.0.0/9']
+    ranges += ['2001:db8::/48', '2001:db8:1::/48', '2001:db9::/33',
+               '2001:dba::1', '2001:dba::2/127']
+    return ranges
+
+
+class TestParallelAggregation(unittest.TestCase):
+    """Parallel mode must give same result as serial mode.
+
+    """
+    def assert_same(self, ranges, maxranges):
+        serial = IPRangeAggregation(
+                ranges, maxranges_ipv4=maxranges, maxranges_ipv6=maxranges)
+        parallel = IPRangeAggregation(
+                ranges, maxranges_ipv4=maxranges, maxranges_ipv6=maxranges,
+                processes=3)
+
+        self.assertEqual(serial.export_aggregated(),
+                         parallel.export_aggregated())
+        self.assertEqual(serial.export_missings(),
+                         parallel.export_missings())
+        for (serials, parallels) in [
+                (serial.aggregateds_ipv4, parallel.aggregateds_ipv4),
+                (serial.aggregateds_ipv6, parallel.aggregateds_ipv6)]:
+            self.assertEqual(
+                sorted(str(dedup) for arange in serials
+                       for dedup in arange.dedups),
+                sorted(str(dedup) for arange in parallels
+                       for dedup in arange.dedups))
+
+    def test_aggregate(self):
+        for seed in range(4):
+            self.assert_same(generate_ranges(seed, 400), None)
+
+    def test_rough_aggregate(self):
+        for seed in range(4):
+            ranges = generate_ranges(seed, 400)
+            for maxranges in [1, 2, 3, 10, 40, 150, 10000]:
+                with self.subTest(seed=seed, maxranges=maxranges):
+                    self.assert_same(ranges, maxranges)
+
+    def test_rough_aggregate_over_shards(self):
+        # Rough aggregation over shard boundary joins missings
+        # in different order for serial and parallel mode.
+        self.assert_same(['2401:e000::/20', '2001:2c05:f611:3340::/59'], 1)
+
+        for seed in range(10):
+            rand = random.Random(seed)
+            ranges = []
+            for _ in range(rand.randint(2, 8)):
+                prefixlen = rand.choice([rand.randint(8, 15),
+                                         rand.randint(16, 64)])
+                address = (0x2 << 124 | rand.getrandbits(124)) \
+                    & ~((1 << (128 - prefixlen)) - 1)
+                ranges.append(str(ipaddress.IPv6Network((address, prefixlen))))
+            for maxranges in [1, 2, 3]:
+                with self.subTest(seed=seed, maxranges=maxranges):
+                    self.assert_same(ranges, maxranges)
+
+    def test_sample(self):
+        filename = os.path.join(os.path.dirname(__file__), 'sample01.txt')
+        with open(filename, 'r') as fd:
+            ranges = fd.readlines()
+        for maxranges in [None, 2]:
+            self.assert_same(ranges, maxranges)
+
+
+
+class TestSnapshot(unittest.TestCase):
+    """Snapshot must keep result, and reject broken files.
+
+    """
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmpdir.name, 'aggr.snap')
+        self.aggr = IPRangeAggregation(
+                generate_ranges(0, 200), maxranges_ipv4=40, maxranges_ipv6=2)
+        self.aggr.save(self.path)
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, data):
+        with open(self.path, 'wb') as fd:
+            fd.write(data)
+
+    def read(self):
+        with open(self.path, 'rb') as fd:
+            return fd.read()
+
+    def test_roundtrip(self):
+        snapshot = ipaggr.load(self.path)
+        self.assertTrue(ipaggr.is_snapshot(self.path))
+        self.assertEqual(snapshot.export_aggregated(),
+                         self.aggr.export_aggregated())
+        self.assertEqual(snapshot.export_missings(),
+                         self.aggr.export_missings())
+        self.assertEqual(list(snapshot.iter_aggregated_ipv6()),
+                         list(self.aggr.iter_aggregated_ipv6()))
+
+        # Case: Saved again from snapshot.
+        path = os.path.join(self.tmpdir.name, 'copy.snap')
+        snapshot.save(path)
+        snapshot.close()
+        copied = ipaggr.load(path)
+        self.assertEqual(copied.export_aggregated(),
+                         self.aggr.export_aggregated())
+        self.assertEqual(copied.export_missings(),
+                         self.aggr.export_missings())
+        copied.close()
+
+    def test_close_with_iterator(self):
+        snapshot = ipaggr.load(self.path)
+        iterator = snapshot.iter_aggregated_ipv4()
+        next(iterator)
+        snapshot.close()
+        with self.assertRaises(ValueError):
+            next(iterator)
+
+    def test_empty(self):
+        self.write(b'')
+        self.assertFalse(ipaggr.is_snapshot(self.path))
+        with self.assertRaises(ipaggr.SnapshotFormatError):
+            ipaggr.load(self.path)
+
+    def test_truncated(self):
+        data = self.read()
+        for size in [ipaggr.SNAPSHOT_HEADER.size - 1,
+                     ipaggr.SNAPSHOT_HEADER.size, len(data) // 2]:
+            with self.subTest(size=size):
+                self.write(data[:size])
+                with self.assertRaises(ipaggr.SnapshotFormatError):
+                    ipaggr.load(self.path)
+
+    def test_magic_and_version(self):
+        data = self.read()
+        self.write(b'IPAGGX\x00\x00' + data[8:])
+        with self.assertRaises(ipaggr.SnapshotFormatError):
+            ipaggr.load(self.path)
+
+        version = (ipaggr.SNAPSHOT_VERSION + 1).to_bytes(4, 'little')
+        self.write(data[:8] + version + data[12:])
+        with self.assertRaises(ipaggr.SnapshotFormatError):
+            ipaggr.load(self.path)
+
+    def test_invalid_range(self):
+        for (sections, broken) in [
+                ([[(10 << 24, 33)], [], [], []], 'export_aggregated'),
+                ([[(10 << 24 | 1, 24)], [], [], []], 'export_aggregated'),
+                ([[], [(1, 64)], [], []], 'export_aggregated'),
+                ([[], [], [], [(1 << 64, 129)]], 'export_missings')]:
+            with self.subTest(sections=sections):
+                ipaggr._save_snapshot(self.path, sections)
+                snapshot = ipaggr.load(self.path)
+                with self.assertRaises(ipaggr.SnapshotFormatError):
+                    getattr(snapshot, broken)()
+                snapshot.close()
+
+
+if __name__ == '__main__':
+    unittest.main()
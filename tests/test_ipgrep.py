@@ -0,0 +1,123 @@
+import os
+import re
+import sys
+import random
+import unittest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from tools import str2network
+from ipgrep import MATCH_TYPES
+from ipgrep import StreamMatcher
+from ipgrep import find_match_type
+from ipgrep import parse_line
+
+
+EDGE_LINES = [
+    '10.0.0.1',
+    '010.0.0.1 10.00.0.1 10.0.0.01',
+    '10.0.0.1/33 10.0.0.0/32 10.0.0.0/0',
+    '10.0.0.1/24 10.0.0.0/24 10.0.0.0/',
+    '256.0.0.1 1.2.3 1.2.3.4.5 ...',
+    '1.2.3.4:80 [::1]:443 1.2.3.4,5.6.7.8',
+    '::ffff:1.2.3.4 ::ffff:1.2.3.4/96 ::ffff:1.2.3.0/120',
+    '1:2:3:4:5:6:1.2.3.4 1:2:3:4:5:6:7:8 1:2:3:4:5:6:7',
+    '2001:200::1 2001:200::/32 2001:200::1/129 2001:200::1/64',
+    ':: ::/0 ::: 1::2::3 :',
+    'src=192.168.0.1:1234 dst=192.168.0.255',
+    '',
+]
+
+
+def baseline_parse_line(line):
+    """Parse line same as former CompiledFile._compile.
+
+    """
+    for candidate in re.finditer(r'[\d\.:]+(/\d{1,3}){0,1}', line):
+        try:
+            network = str2network(candidate.group())
+        except:
+            continue
+        yield (candidate.start(), network)
+
+
+def baseline_find(keywords, target, match_type):
+    """Best match type of several keywords by find_match_type.
+
+    """
+    founds = [find_match_type(keyword, target, match_type)
+              for keyword in keywords if keyword.version == target.version]
+    for found in MATCH_TYPES:
+        if found in founds:
+            return found
+    return None
+
+
+class TestParseLine(unittest.TestCase):
+    """parse_line must find same networks as regex and str2network.
+
+    """
+    def test_edge_cases(self):
+        for line in EDGE_LINES:
+            with self.subTest(line=line):
+                self.assertEqual(list(parse_line(line)),
+                                 list(baseline_parse_line(line)))
+
+    def test_random(self):
+        rand = random.Random(0)
+        chars = '0123456789.:/ ,'
+        for _ in range(2000):
+            line = ''.join(rand.choice(chars)
+                           for _ in range(rand.randint(1, 40)))
+            with self.subTest(line=line):
+                self.assertEqual(list(parse_line(line)),
+                                 list(baseline_parse_line(line)))
+
+
+class TestStreamMatcher(unittest.TestCase):
+    """StreamMatcher must decide same match type as find_match_type.
+
+    """
+    KEYWORDS = ['10.0.0.0/8', '10.1.0.0/16', '10.1.2.3', '192.168.0.0/24',
+                '192.168.0.128/25', '2001:200::/32', '2001:200::1',
+                '::ffff:1.2.3.4']
+
+    def targets(self):
+        targets = [network for line in EDGE_LINES
+                   for (_, network) in parse_line(line)]
+        targets += [str2network(keyword) for keyword in self.KEYWORDS]
+
+        rand = random.Random(0)
+        for keyword in self.KEYWORDS:
+            network = str2network(keyword)
+            bits = network.max_prefixlen
+            for _ in range(50):
+                prefixlen = rand.randint(0, bits)
+                address = int(network.network_address) \
+                    ^ rand.getrandbits(bits) >> rand.randint(0, bits)
+                address &= ~((1 << (bits - prefixlen)) - 1) & ((1 << bits) - 1)
+                targets.append(type(network)((address, prefixlen)))
+        return targets
+
+    def assert_same(self, keyword_strs, targets):
+        keywords = [str2network(keyword) for keyword in keyword_strs]
+        for match_type in (None,) + MATCH_TYPES:
+            matcher = StreamMatcher(keyword_strs, match_type=match_type)
+            for target in targets:
+                with self.subTest(keywords=keyword_strs, target=target,
+                                  match_type=match_type):
+                    self.assertEqual(
+                        matcher.find(target),
+                        baseline_find(keywords, target, match_type))
+
+    def test_single_keyword(self):
+        targets = self.targets()
+        for keyword in self.KEYWORDS:
+            self.assert_same([keyword], targets)
+
+    def test_many_keywords(self):
+        self.assert_same(self.KEYWORDS, self.targets())
+
+
+if __name__ == '__main__':
+    unittest.main()
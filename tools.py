@@ -18,11 +18,18 @@ class NetworkFormatError(Exception):
 ########################################
 def str2network(iprange_str_in):
     """Generate IPv4Network or IPv6Network inscance.
+    Range format is accepted when it is exactly one network.
 
     """
     network = None
 
     iprange_str = iprange_str_in.strip()
+    if is_iprange_str(iprange_str):
+        networks = str2networks(iprange_str)
+        if len(networks) != 1:
+            raise NetworkFormatError(iprange_str)
+        return networks[0]
+
     if not network:
         try:
             network = ipaddress.IPv4Network(iprange_str)
@@ -51,6 +58,86 @@ def str2network(iprange_str_in):
     return network
 
 
+def is_iprange_str(iprange_str):
+    """Check string is in range format or not.
+    'start-end' or 'start count'.
+
+    """
+    return '-' in iprange_str or len(iprange_str.split()) == 2
+
+
+def str2iprange(iprange_str_in):
+    """Parse range format string to integers.
+
+    Args:
+        iprange_str_in(str): 'start-end' or 'start count' format range.
+            ex.) '192.168.0.1-192.168.0.10', '192.168.0.0 256'
+
+    Returns:
+        tuple: (version, first address as int, last address as int)
+
+    """
+    iprange_str = iprange_str_in.strip()
+    try:
+        if '-' in iprange_str:
+            (first_str, last_str) = iprange_str.split('-', 1)
+            first = ipaddress.ip_address(first_str.strip())
+            last = ipaddress.ip_address(last_str.strip())
+            if first.version != last.version:
+                raise ValueError(iprange_str)
+            (start, end) = (int(first), int(last))
+        else:
+            (first_str, count_str) = iprange_str.split()
+            first = ipaddress.ip_address(first_str)
+            start = int(first)
+            end = start + int(count_str) - 1
+    except ValueError:
+        raise NetworkFormatError(iprange_str)
+
+    if end < start or end >= 1 << first.max_prefixlen:
+        raise NetworkFormatError(iprange_str)
+    return (first.version, start, end)
+
+
+def str2networks(iprange_str_in):
+    """Generate list of IPv4Network or IPv6Network instances.
+    Range format is converted to minimal networks on integers.
+
+    """
+    iprange_str = iprange_str_in.strip()
+    if not is_iprange_str(iprange_str):
+        return [str2network(iprange_str)]
+
+    (version, start, end) = str2iprange(iprange_str)
+    if version == 4:
+        (network_class, bits) = (ipaddress.IPv4Network, 32)
+    else:
+        (network_class, bits) = (ipaddress.IPv6Network, 128)
+    return [network_class(pair) for pair in iprange2cidrs(start, end, bits)]
+
+
+def iprange2cidrs(start, end, bits):
+    """Split integer address range into minimal CIDR blocks.
+
+    Args:
+        start(int): First address of range.
+        end(int): Last address of range.
+        bits(int): Address length, 32 for IPv4 and 128 for IPv6.
+
+    Yields:
+        tuple: (network address as int, prefix length).
+
+    """
+    while start <= end:
+        if start:
+            alignment = (start & -start).bit_length() - 1
+        else:
+            alignment = bits
+        hostbits = min(alignment, (end - start + 1).bit_length() - 1)
+        yield (start, bits - hostbits)
+        start += 1 << hostbits
+
+
 ########################################
 # Functional Class
 ########################################